@@ -3,78 +3,201 @@ Auto Shorts App - FastAPI Backend
 Handles video upload, processing, and AI metadata generation.
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import Optional, List
-import uuid
+import secrets
 import asyncio
 import os
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 import random
 
+import aiofiles
+import msgspec
+import orjson
+import redis.asyncio as aioredis
+
 app = FastAPI(
     title="Auto Shorts API",
     description="Backend API for Auto Shorts Android App",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# CORS for mobile app. Explicit lists keep Starlette on its set-membership
+# fast path instead of the allow-all regex; extend via CORS_ORIGINS
+_CORS_ORIGINS = tuple(
+    origin for origin in os.getenv(
+        "CORS_ORIGINS",
+        "http://localhost:3000,http://localhost:8000,http://10.0.2.2:8000"
+    ).split(",") if origin
 )
 
-# CORS for mobile app
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=_CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "OPTIONS"),
+    allow_headers=("Authorization", "Content-Type"),
 )
 
-# In-memory storage (use database in production)
-videos = {}
-jobs = {}
+# Status responses repeat the same step objects every poll and gzip well;
+# level 1 keeps compression CPU negligible
+app.add_middleware(GZipMiddleware, minimum_size=256, compresslevel=1)
+
+@app.on_event("startup")
+async def enable_eager_tasks():
+    """Run tasks eagerly so coroutines that never suspend skip the event loop queue (Python 3.12+)."""
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
+@app.on_event("startup")
+async def create_worker_pool():
+    """Shared thread pool for blocking work (FFmpeg, transcription) so it never stalls the event loop."""
+    app.state.pool = ThreadPoolExecutor(max_workers=int(os.getenv("WORKER_POOL_SIZE", 32)))
+
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    app.state.pool.shutdown(wait=False)
+
+# Redis-backed storage (shared across workers, entries expire automatically)
+redis = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+VIDEO_TTL = 86400  # seconds before an uploaded video record expires
+JOB_TTL = 3600     # seconds before a processing job record expires
+
+# Per-worker RNG for non-crypto picks, seeded once from the OS
+_rng = random.Random(os.urandom(16))
+
+# Processing pipeline steps, in order
+_STEP_NAMES = ("Analyzing Video", "Extracting Highlights", "Generating Captions",
+               "Creating Shorts", "Finalizing")
+
+# Cap simultaneous processing jobs so burst traffic can't pile up coroutines
+_PROCESS_SEM = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_JOBS", 32)))
+
+# Uploaded files are streamed to disk in chunks, never buffered whole in RAM
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+async def get_video(video_id: str) -> Optional[dict]:
+    data = await redis.get(f"video:{video_id}")
+    return orjson.loads(data) if data is not None else None
+
+async def save_video(video_id: str, video: dict):
+    await redis.set(f"video:{video_id}", orjson.dumps(video), ex=VIDEO_TTL)
+
+# Per-step states, packed two bits each into Job.step_mask
+STEP_PENDING, STEP_IN_PROGRESS, STEP_COMPLETED = 0, 1, 2
+_STEP_STATUS = ("pending", "in_progress", "completed")
+
+@dataclass(slots=True)
+class Job:
+    """Compact per-job state; step statuses live in a 2-bit-per-step mask."""
+    job_id: str
+    video_id: str
+    status: str = "processing"
+    progress: int = 0
+    current_step: str = "Initializing..."
+    step_mask: int = 0
+    clips: list = field(default_factory=list)
+    duration: int = 60
+    quantity: int = 3
+    language: str = "en"
+    created_at: float = field(default_factory=time.time)
+
+    def step_state(self, i: int) -> int:
+        return (self.step_mask >> (2 * i)) & 0b11
+
+    def set_step_state(self, i: int, state: int):
+        shift = 2 * i
+        self.step_mask = (self.step_mask & ~(0b11 << shift)) | (state << shift)
+
+    def to_dict(self) -> dict:
+        """Expand the packed state into the shape the API has always returned."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "current_step": self.current_step,
+            "steps": [{"name": name, "status": _STEP_STATUS[self.step_state(i)]}
+                      for i, name in enumerate(_STEP_NAMES)],
+            "clips": self.clips,
+        }
+
+async def get_job(job_id: str) -> Optional[Job]:
+    data = await redis.get(f"job:{job_id}")
+    return Job(**orjson.loads(data)) if data is not None else None
+
+async def save_job(job: Job):
+    await redis.set(f"job:{job.job_id}", orjson.dumps(job), ex=JOB_TTL)
+
+def _iso(ts: float) -> str:
+    """Format a stored epoch timestamp as ISO 8601 (egress only)."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
 
 # ============ Models ============
 
-class YouTubeUploadRequest(BaseModel):
+class YouTubeUploadRequest(msgspec.Struct):
     url: str
 
-class ProcessRequest(BaseModel):
+class ProcessRequest(msgspec.Struct):
     video_id: str
     duration: int = 60
     quantity: int = 3
     language: str = "en"
 
-class CaptionStyle(BaseModel):
+class CaptionStyle(msgspec.Struct):
     style: str = "Modern"
     color: str = "#FFFFFF"
     font_size: int = 24
     position: str = "bottom"
 
-class RegenerateRequest(BaseModel):
+class RegenerateRequest(msgspec.Struct):
     job_id: str
     clip_id: str
     caption_style: CaptionStyle
 
-class RocketRequest(BaseModel):
+class RocketRequest(msgspec.Struct):
     clip_id: str
     platform: Optional[str] = None
 
-class ShareRequest(BaseModel):
+class ShareRequest(msgspec.Struct):
     clip_id: str
     video_url: str
     title: Optional[str] = None
     description: Optional[str] = None
     hashtags: Optional[List[str]] = None
 
+def msgspec_body(struct_type):
+    """Dependency that decodes the raw request body straight into a msgspec Struct."""
+    async def decode(request: Request):
+        try:
+            return msgspec.json.decode(await request.body(), type=struct_type)
+        except msgspec.DecodeError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+    return decode
+
 # ============ Endpoints ============
 
+# Constant bodies, encoded once: health probes hit these endpoints constantly
+_ROOT_BODY = orjson.dumps({"message": "Auto Shorts API is running!", "version": "1.0.0"})
+_HEALTH_BODY = orjson.dumps({"status": "healthy"})
+
 @app.get("/")
 async def root():
-    return {"message": "Auto Shorts API is running!", "version": "1.0.0"}
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 # Upload video file
 @app.post("/api/upload")
@@ -83,17 +206,22 @@ async def upload_video(
     url: Optional[str] = None
 ):
     """Upload a video file or YouTube URL."""
-    video_id = str(uuid.uuid4())[:8]
+    video_id = secrets.token_hex(4)
     
     if file:
-        # Handle file upload
+        # Handle file upload: stream to disk chunk by chunk
         filename = file.filename or "video.mp4"
-        videos[video_id] = {
+        path = os.path.join(UPLOAD_DIR, f"{video_id}_{os.path.basename(filename)}")
+        async with aiofiles.open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
+        await save_video(video_id, {
             "id": video_id,
             "filename": filename,
+            "path": path,
             "source": "file",
-            "uploaded_at": datetime.now().isoformat()
-        }
+            "uploaded_at": time.time()
+        })
         return {
             "video_id": video_id,
             "filename": filename,
@@ -102,13 +230,13 @@ async def upload_video(
         }
     elif url:
         # Handle YouTube URL (simulation)
-        videos[video_id] = {
+        await save_video(video_id, {
             "id": video_id,
             "filename": f"youtube_{video_id}.mp4",
             "source": "youtube",
             "url": url,
-            "uploaded_at": datetime.now().isoformat()
-        }
+            "uploaded_at": time.time()
+        })
         return {
             "video_id": video_id,
             "filename": f"youtube_{video_id}.mp4",
@@ -120,16 +248,16 @@ async def upload_video(
 
 # Upload via JSON body (for YouTube URLs)
 @app.post("/api/upload/url")
-async def upload_youtube_url(request: YouTubeUploadRequest):
+async def upload_youtube_url(request: YouTubeUploadRequest = Depends(msgspec_body(YouTubeUploadRequest))):
     """Upload video via YouTube URL."""
-    video_id = str(uuid.uuid4())[:8]
-    videos[video_id] = {
+    video_id = secrets.token_hex(4)
+    await save_video(video_id, {
         "id": video_id,
         "filename": f"youtube_{video_id}.mp4",
         "source": "youtube",
         "url": request.url,
-        "uploaded_at": datetime.now().isoformat()
-    }
+        "uploaded_at": time.time()
+    })
     return {
         "video_id": video_id,
         "filename": f"youtube_{video_id}.mp4",
@@ -139,34 +267,22 @@ async def upload_youtube_url(request: YouTubeUploadRequest):
 
 # Start processing
 @app.post("/api/process")
-async def process_video(request: ProcessRequest, background_tasks: BackgroundTasks):
+async def process_video(background_tasks: BackgroundTasks, request: ProcessRequest = Depends(msgspec_body(ProcessRequest))):
     """Start video processing."""
-    if request.video_id not in videos:
+    if await get_video(request.video_id) is None:
         raise HTTPException(status_code=404, detail="Video not found")
-    
-    job_id = str(uuid.uuid4())[:8]
-    
+
+    job_id = secrets.token_hex(4)
+
     # Create job
-    jobs[job_id] = {
-        "job_id": job_id,
-        "video_id": request.video_id,
-        "status": "processing",
-        "progress": 0,
-        "current_step": "Initializing...",
-        "steps": [
-            {"name": "Analyzing Video", "status": "pending"},
-            {"name": "Extracting Highlights", "status": "pending"},
-            {"name": "Generating Captions", "status": "pending"},
-            {"name": "Creating Shorts", "status": "pending"},
-            {"name": "Finalizing", "status": "pending"}
-        ],
-        "clips": [],
-        "duration": request.duration,
-        "quantity": request.quantity,
-        "language": request.language,
-        "created_at": datetime.now().isoformat()
-    }
-    
+    await save_job(Job(
+        job_id=job_id,
+        video_id=request.video_id,
+        duration=request.duration,
+        quantity=request.quantity,
+        language=request.language
+    ))
+
     # Simulate processing in background
     background_tasks.add_task(simulate_processing, job_id, request.quantity)
     
@@ -177,26 +293,68 @@ async def process_video(request: ProcessRequest, background_tasks: BackgroundTas
     }
 
 async def simulate_processing(job_id: str, quantity: int):
-    """Simulate video processing with progress updates."""
-    if job_id not in jobs:
-        return
-    
-    steps = ["Analyzing Video", "Extracting Highlights", "Generating Captions", "Creating Shorts", "Finalizing"]
-    
-    for i, step in enumerate(steps):
-        # Update current step
-        jobs[job_id]["current_step"] = step
-        jobs[job_id]["steps"][i]["status"] = "in_progress"
-        
-        # Simulate work
-        await asyncio.sleep(2)
-        
-        # Update progress
-        progress = int(((i + 1) / len(steps)) * 100)
-        jobs[job_id]["progress"] = progress
-        jobs[job_id]["steps"][i]["status"] = "completed"
-    
-    # Generate clips
+    """Simulate video processing with progress updates.
+
+    Schedules every 2-second step transition up front with call_later and
+    returns immediately, so no coroutine sits parked in a sleep loop for
+    the life of the job; the timer heap holds only lightweight handles.
+    The semaphore slot is held until the final transition releases it.
+    """
+    await _PROCESS_SEM.acquire()
+    loop = asyncio.get_running_loop()
+    for tick in range(len(_STEP_NAMES) + 1):
+        loop.call_later(2 * tick, _schedule_advance, job_id, tick, quantity)
+
+def _schedule_advance(job_id: str, tick: int, quantity: int):
+    asyncio.get_running_loop().create_task(_advance(job_id, tick, quantity))
+
+# Serializes the load/modify/store of each job's record across its ticks,
+# so a reader never observes a half-applied transition
+_job_locks = {}
+
+# Wakes streaming clients when a job's state changes (this worker only)
+_job_events = {}
+
+def _notify_job(job_id: str):
+    event = _job_events.get(job_id)
+    if event is not None:
+        event.set()
+
+async def _advance(job_id: str, tick: int, quantity: int):
+    """Apply the step transition for tick (2 * tick seconds into the job)."""
+    lock = _job_locks.setdefault(job_id, asyncio.Lock())
+    try:
+        async with lock:
+            job = await get_job(job_id)
+            if job is None:
+                return
+
+            if tick > 0:
+                # Previous step finished
+                job.set_step_state(tick - 1, STEP_COMPLETED)
+                job.progress = int((tick / len(_STEP_NAMES)) * 100)
+
+            if tick < len(_STEP_NAMES):
+                # Next step starts
+                job.current_step = _STEP_NAMES[tick]
+                job.set_step_state(tick, STEP_IN_PROGRESS)
+            else:
+                # All steps done: generate clips on the worker pool (this is
+                # where real encoding work lands) and complete the job
+                loop = asyncio.get_running_loop()
+                job.clips = await loop.run_in_executor(
+                    app.state.pool, _generate_clips, job_id, quantity)
+                job.status = "completed"
+                job.current_step = "Complete!"
+
+            await save_job(job)
+            _notify_job(job_id)
+    finally:
+        if tick == len(_STEP_NAMES):
+            _PROCESS_SEM.release()
+            _job_locks.pop(job_id, None)
+
+def _generate_clips(job_id: str, quantity: int) -> list:
     clips = []
     for j in range(quantity):
         clip_id = f"clip_{job_id}_{j+1}"
@@ -204,37 +362,79 @@ async def simulate_processing(job_id: str, quantity: int):
             "id": clip_id,
             "url": f"https://sample-videos.com/video123/mp4/720/big_buck_bunny_720p_1mb.mp4",
             "thumbnail_url": f"https://picsum.photos/seed/{clip_id}/270/480",
-            "duration": random.choice([30, 45, 60]),
+            "duration": _rng.choice((30, 45, 60)),
             "title": f"Viral Short #{j+1}"
         })
-    
-    jobs[job_id]["clips"] = clips
-    jobs[job_id]["status"] = "completed"
-    jobs[job_id]["current_step"] = "Complete!"
+    return clips
 
 # Get job status
-@app.get("/api/process/status/{job_id}")
-async def get_job_status(job_id: str):
+@app.get("/api/process/status/{job_id}", response_class=ORJSONResponse)
+async def get_job_status(job_id: str, request: Request):
     """Get the status of a processing job."""
-    if job_id not in jobs:
+    job = await get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    
-    job = jobs[job_id]
-    return {
-        "job_id": job["job_id"],
-        "status": job["status"],
-        "progress": job["progress"],
-        "current_step": job["current_step"],
-        "steps": job["steps"],
-        "clips": job.get("clips", []),
-        "estimated_time_remaining": max(0, 100 - job["progress"]) // 10 * 2
-    }
+
+    # The client polls every second; answer unchanged states with a 304
+    etag = f'"{job.progress}-{job.step_mask}-{job.status}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+
+    status = job.to_dict()
+    status["estimated_time_remaining"] = max(0, 100 - job.progress) // 10 * 2
+    return ORJSONResponse(status, headers={"ETag": etag})
+
+# Stream job status updates
+@app.get("/api/process/stream/{job_id}")
+async def stream_job_status(job_id: str):
+    """Stream job status updates as Server-Sent Events.
+
+    Pushes a full status payload whenever the job actually changes, so a
+    10-second job costs one request instead of ten polls.
+    """
+    if await get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Content-Encoding: identity makes GZipMiddleware pass the stream through
+    # untouched; gzip would buffer the small events until the stream closes
+    return StreamingResponse(
+        _job_event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Content-Encoding": "identity"},
+    )
+
+async def _job_event_stream(job_id: str):
+    event = _job_events.setdefault(job_id, asyncio.Event())
+    last_state = None
+    try:
+        while True:
+            job = await get_job(job_id)
+            if job is None:
+                break
+
+            state = (job.progress, job.step_mask, job.status)
+            if state != last_state:
+                last_state = state
+                yield b"data: " + orjson.dumps(job.to_dict()) + b"\n\n"
+
+            if job.status == "completed":
+                break
+
+            event.clear()
+            try:
+                # The timeout re-checks Redis in case another worker
+                # advanced the job and our local event never fired
+                await asyncio.wait_for(event.wait(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if _job_events.get(job_id) is event:
+            _job_events.pop(job_id, None)
 
 # Regenerate clip
 @app.post("/api/process/regenerate")
-async def regenerate_clip(request: RegenerateRequest):
+async def regenerate_clip(request: RegenerateRequest = Depends(msgspec_body(RegenerateRequest))):
     """Regenerate a clip with new caption style."""
-    if request.job_id not in jobs:
+    if await get_job(request.job_id) is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
     # Simulate regeneration
@@ -247,46 +447,46 @@ async def regenerate_clip(request: RegenerateRequest):
         "status": "regenerated"
     }
 
+# Rocket metadata pools (simulated AI generation)
+_TITLES = (
+    "🔥 This changed everything!",
+    "Wait for it... 😱",
+    "POV: You just discovered this",
+    "Nobody talks about this enough",
+    "This is why you need to see this"
+)
+
+_DESCRIPTIONS = (
+    "You won't believe what happens next! Watch until the end 👀",
+    "This is the content you've been waiting for ✨",
+    "Drop a comment if you agree! 💬",
+    "Save this for later, you'll thank me 🙏",
+    "Tag someone who needs to see this 👇"
+)
+
+_HASHTAGS = ("fyp", "viral", "trending", "shorts", "reels",
+             "explore", "foryou", "trend", "video", "content")
+
 # Generate rocket metadata
 @app.post("/api/rocket/generate")
-async def generate_rocket_metadata(request: RocketRequest):
+async def generate_rocket_metadata(request: RocketRequest = Depends(msgspec_body(RocketRequest))):
     """Generate AI-powered metadata for sharing."""
-    
-    # Simulate AI generation
-    titles = [
-        "🔥 This changed everything!",
-        "Wait for it... 😱",
-        "POV: You just discovered this",
-        "Nobody talks about this enough",
-        "This is why you need to see this"
-    ]
-    
-    descriptions = [
-        "You won't believe what happens next! Watch until the end 👀",
-        "This is the content you've been waiting for ✨",
-        "Drop a comment if you agree! 💬",
-        "Save this for later, you'll thank me 🙏",
-        "Tag someone who needs to see this 👇"
-    ]
-    
-    hashtags = ["fyp", "viral", "trending", "shorts", "reels", 
-                "explore", "foryou", "trend", "video", "content"]
-    
     return {
-        "title": random.choice(titles),
-        "description": random.choice(descriptions),
-        "hashtags": random.sample(hashtags, 5),
+        "title": _rng.choice(_TITLES),
+        "description": _rng.choice(_DESCRIPTIONS),
+        "hashtags": _rng.sample(_HASHTAGS, 5),
         "suggested_time": "6:00 PM - 9:00 PM"
     }
 
+# Platforms the share endpoint accepts
+_VALID_PLATFORMS = frozenset({"instagram", "youtube", "tiktok"})
+
 # Share to platform
 @app.post("/api/share/{platform}")
-async def share_video(platform: str, request: ShareRequest):
+async def share_video(platform: str, request: ShareRequest = Depends(msgspec_body(ShareRequest))):
     """Share video to a platform."""
-    valid_platforms = ["instagram", "youtube", "tiktok"]
-    
-    if platform.lower() not in valid_platforms:
-        raise HTTPException(status_code=400, detail=f"Invalid platform. Use: {valid_platforms}")
+    if platform.lower() not in _VALID_PLATFORMS:
+        raise HTTPException(status_code=400, detail=f"Invalid platform. Use: {sorted(_VALID_PLATFORMS)}")
     
     return {
         "success": True,
@@ -299,4 +499,12 @@ async def share_video(platform: str, request: ShareRequest):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Import string rather than the app object: uvicorn requires it for workers > 1
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+    )